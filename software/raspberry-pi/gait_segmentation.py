@@ -6,9 +6,102 @@ Detects:
 2. Gait changes using variance and frequency analysis
 """
 
+import threading
+
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.fft import rfft, rfftfreq
 from typing import List, Dict
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _window_variances_kernel(mag, n_windows, window_size, window_step):
+    """Single-pass variance per window. Compiled with numba when available:
+    np.var's per-call overhead dwarfs the arithmetic at ~194 samples, and the
+    fused loop makes one pass over each window instead of two."""
+    variances = np.empty(n_windows, dtype=np.float32)
+    for i in range(n_windows):
+        base = i * window_step
+        s = 0.0
+        s2 = 0.0
+        for j in range(window_size):
+            v = mag[base + j]
+            s += v
+            s2 += v * v
+        m = s / window_size
+        variances[i] = s2 / window_size - m * m
+    return variances
+
+
+def _merge_boundaries_kernel(bounds, types, conf, min_samples):
+    """Merge boundaries closer than min_samples on contiguous arrays.
+    Priority when two collide: movement changes (differing type) beat gait
+    changes, then higher confidence wins. Compiled with numba when
+    available; runs fine as plain Python otherwise."""
+    n = bounds.shape[0]
+    out_b = np.empty(n, dtype=np.int64)
+    out_t = np.empty(n, dtype=np.int8)
+    out_c = np.empty(n, dtype=np.float32)
+    out_b[0] = bounds[0]
+    out_t[0] = types[0]
+    out_c[0] = conf[0]
+    k = 1
+    for i in range(1, n):
+        if bounds[i] - out_b[k - 1] >= min_samples:
+            out_b[k] = bounds[i]
+            out_t[k] = types[i]
+            out_c[k] = conf[i]
+            k += 1
+        elif types[i] != out_t[k - 1] or conf[i] > out_c[k - 1]:
+            out_b[k - 1] = bounds[i]
+            out_t[k - 1] = types[i]
+            out_c[k - 1] = conf[i]
+    return out_b[:k], out_t[:k], out_c[:k]
+
+
+if njit is not None:
+    _window_variances_kernel = njit(cache=True, fastmath=True)(_window_variances_kernel)
+    _merge_boundaries_kernel = njit(cache=True)(_merge_boundaries_kernel)
+
+
+# Zero-padded scratch for the batched FFT, kept per (window_size, fft_len)
+# and reused across calls so repeated segmentation requests don't reallocate
+# a windows-sized buffer each time. The lock is held for the whole transform
+# because callers share the buffer. Only the first window_size columns are
+# ever written, so the pad region stays zero from allocation — the key must
+# include window_size, or two sample rates padding to the same fft_len would
+# see each other's leftover samples in the pad columns.
+_fft_scratch = {}
+_fft_scratch_lock = threading.Lock()
+
+# The Hann window and frequency bins depend only on the window geometry and
+# sample rate, which are the same on every call in practice — build them once
+# and reuse rather than recomputing a cosine table per request.
+_window_tables = {}
+
+
+def _hann_and_freq_bins(window_size, fft_len, sample_rate):
+    key = (window_size, fft_len, sample_rate)
+    tables = _window_tables.get(key)
+    if tables is None:
+        tables = (np.hanning(window_size).astype(np.float32),
+                  rfftfreq(fft_len, 1.0 / sample_rate).astype(np.float32))
+        _window_tables[key] = tables
+    return tables
+
+
+def _padded_scratch(n_rows, window_size, fft_len):
+    key = (window_size, fft_len)
+    buf = _fft_scratch.get(key)
+    if buf is None or buf.shape[0] < n_rows:
+        buf = np.zeros((n_rows, fft_len), dtype=np.float32)
+        _fft_scratch[key] = buf
+    return buf[:n_rows]
+
 
 def segment_gait(magnitude: List[float],
                  sample_rate: int = 194,
@@ -36,28 +129,37 @@ def segment_gait(magnitude: List[float],
         return _empty_result(magnitude, sample_rate, movement_threshold,
                             variance_threshold, frequency_threshold, min_segment_seconds)
 
-    mag = np.array(magnitude)
+    # float32 halves memory traffic on the Pi and scipy.fft preserves the
+    # dtype through the transform; accel magnitudes fit comfortably
+    mag = np.asarray(magnitude, dtype=np.float32)
     window_size = sample_rate  # 1 second window
     window_step = sample_rate // 2  # 50% overlap
     min_samples = int(min_segment_seconds * sample_rate)
 
-    # Calculate windowed statistics
-    windows = []
-    window_starts = []
-    window_centers = []
+    # Calculate windowed statistics. sliding_window_view gives a strided 2-D
+    # view (no copies), so the per-window reductions below run as single
+    # vectorized calls instead of a Python loop.
+    windows = sliding_window_view(mag, window_size)[::window_step]
+    n_windows = windows.shape[0]
+    window_starts = (np.arange(n_windows) * window_step).tolist()
+    window_centers = [s + window_size // 2 for s in window_starts]
 
-    for i in range(0, len(mag) - window_size + 1, window_step):
-        window = mag[i:i + window_size]
-        windows.append(window)
-        window_starts.append(i)
-        window_centers.append(i + window_size // 2)
-
-    if len(windows) < 2:
+    if n_windows < 2:
         return _empty_result(magnitude, sample_rate, movement_threshold,
                             variance_threshold, frequency_threshold, min_segment_seconds)
 
     # Compute variance for each window
-    variances = np.array([np.var(w) for w in windows])
+    if njit is not None:
+        variances = _window_variances_kernel(mag, n_windows, window_size, window_step)
+    else:
+        # One-pass var = E[x^2] - E[x]^2, with einsum fusing the square and
+        # the row reduction. Avoids the windows-sized (x - mean) temporary
+        # that var(axis=1) materializes — that buffer is what blows the
+        # Pi's cache for long recordings.
+        m = windows.mean(axis=1)
+        variances = np.einsum('ij,ij->i', windows, windows) / window_size - m * m
+        # cancellation can leave a near-zero variance slightly negative
+        np.maximum(variances, 0.0, out=variances)
 
     # Step 1: Classify each window as moving or stationary
     is_moving = variances > movement_threshold
@@ -65,109 +167,114 @@ def segment_gait(magnitude: List[float],
     # Step 2: Detect movement state transitions
     movement_changes = np.diff(is_moving.astype(int))  # 1 = start moving, -1 = stop moving
 
-    # Step 3: Compute gait metrics for moving windows only
-    frequencies = []
-    for i, window in enumerate(windows):
-        if is_moving[i]:
-            # Remove DC component
-            centered = window - np.mean(window)
-            # Apply Hanning window to reduce spectral leakage
-            windowed = centered * np.hanning(len(centered))
-            # FFT
-            fft = np.fft.rfft(windowed)
-            fft_mag = np.abs(fft)
-            # Find dominant frequency
-            if len(fft_mag) > 1:
-                freq_bins = np.fft.rfftfreq(len(window), 1.0 / sample_rate)
-                # Focus on gait-relevant frequencies (0.5 - 5 Hz)
-                valid_mask = (freq_bins >= 0.5) & (freq_bins <= 5.0)
-                if np.any(valid_mask):
-                    valid_fft = fft_mag.copy()
-                    valid_fft[~valid_mask] = 0
-                    dominant_idx = np.argmax(valid_fft)
-                    frequencies.append(freq_bins[dominant_idx])
-                else:
-                    frequencies.append(0.0)
-            else:
-                frequencies.append(0.0)
-        else:
-            frequencies.append(0.0)
-
-    frequencies = np.array(frequencies)
+    # Step 3: Compute gait metrics for moving windows only. The Hanning
+    # window and frequency bins depend only on window_size, so build them
+    # once and run a single batched FFT over all moving windows instead of
+    # one np.fft.rfft call per window.
+    # Zero-pad transforms to the next power of two: the default window of
+    # 194 samples factors as 2*97, and a large prime forces pocketfft onto
+    # its slow Bluestein path. Radix-2 at 256 is far cheaper per sample and
+    # the finer bin spacing doesn't hurt the dominant-frequency pick.
+    fft_len = 1 << (window_size - 1).bit_length()
+    hann, freq_bins = _hann_and_freq_bins(window_size, fft_len, sample_rate)
+    # Focus on gait-relevant frequencies (0.5 - 5 Hz). The band is a
+    # contiguous run of bins (bin k sits at k * sample_rate / fft_len), so
+    # hold it as a slice rather than a boolean mask
+    band_lo = int(np.ceil(0.5 * fft_len / sample_rate))
+    band_hi = min(int(np.floor(5.0 * fft_len / sample_rate)) + 1, fft_len // 2 + 1)
+
+    frequencies = np.zeros(n_windows, dtype=np.float32)
+    moving_idx = np.flatnonzero(is_moving)
+    if moving_idx.size > 0 and band_lo < band_hi:
+        moving = windows[moving_idx]
+        with _fft_scratch_lock:
+            padded = _padded_scratch(moving_idx.size, window_size, fft_len)
+            # Remove DC component and apply Hanning window to reduce
+            # spectral leakage, written straight into the scratch buffer
+            np.subtract(moving, moving.mean(axis=1, keepdims=True),
+                        out=padded[:, :window_size])
+            padded[:, :window_size] *= hann
+            # workers=-1 lets scipy spread the batched transform across the
+            # Pi's cores; np.fft is single-threaded
+            band_mag = np.abs(rfft(padded, axis=1, workers=-1)[:, band_lo:band_hi])
+        # Find each window's dominant frequency within the valid band
+        dominant_idx = band_mag.argmax(axis=1) + band_lo
+        frequencies[moving_idx] = freq_bins[dominant_idx]
 
     # Step 4: Detect gait changes within moving sections
     # Look for LOCAL changes in variance/frequency between consecutive windows
-    gait_change_score = np.zeros(len(windows))
-
-    for i in range(1, len(windows)):
-        if is_moving[i] and is_moving[i-1]:
-            # Both windows are moving - check for gait change
-
-            # Variance ratio between consecutive windows (detects amplitude changes)
-            # A ratio of 2.0 means variance doubled or halved
-            if variances[i-1] > 0:
-                var_ratio = max(variances[i] / variances[i-1], variances[i-1] / variances[i])
-            else:
-                var_ratio = 1.0
-
-            # Convert ratio to a score: ratio of 2 = score of 1, ratio of 1.5 = score of 0.5
-            # variance_threshold now acts as the ratio threshold (e.g., 1.5 = 50% change)
-            var_change_score = max(0, (var_ratio - 1) / (variance_threshold - 1)) if variance_threshold > 1 else 0
-            var_change_score = min(var_change_score, 1.0)
-
-            # Frequency change
-            freq_diff = abs(frequencies[i] - frequencies[i-1])
-            freq_change_score = min(freq_diff / frequency_threshold, 1.0) if frequency_threshold > 0 else 0
-
-            # Combined score - weight amplitude changes more heavily
-            gait_change_score[i] = 0.7 * var_change_score + 0.3 * freq_change_score
-
-    # Step 5: Build segment boundaries
-    raw_boundaries = []
-    raw_types = []
-    raw_confidence = []
+    # (vectorized over all consecutive window pairs at once)
+    gait_change_score = np.zeros(n_windows, dtype=np.float32)
+    v_prev = variances[:-1]
+    v_cur = variances[1:]
+
+    # Variance ratio between consecutive windows (detects amplitude changes)
+    # A ratio of 2.0 means variance doubled or halved
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var_ratio = np.where(v_prev > 0,
+                             np.maximum(v_cur / v_prev, v_prev / v_cur),
+                             1.0)
+
+    # Convert ratio to a score: ratio of 2 = score of 1, ratio of 1.5 = score of 0.5
+    # variance_threshold now acts as the ratio threshold (e.g., 1.5 = 50% change)
+    if variance_threshold > 1:
+        var_change_score = np.clip((var_ratio - 1) / (variance_threshold - 1), 0.0, 1.0)
+    else:
+        var_change_score = 0.0
+
+    # Frequency change
+    if frequency_threshold > 0:
+        freq_change_score = np.minimum(np.abs(np.diff(frequencies)) / frequency_threshold, 1.0)
+    else:
+        freq_change_score = 0.0
+
+    # Combined score - weight amplitude changes more heavily. Only pairs
+    # where both windows are moving get a score.
+    both_moving = is_moving[1:] & is_moving[:-1]
+    gait_change_score[1:] = np.where(both_moving,
+                                     0.7 * var_change_score + 0.3 * freq_change_score,
+                                     0.0)
+
+    # Step 5: Build segment boundaries. Preallocated arrays indexed by a
+    # write position instead of growing Python lists — at most one boundary
+    # per window plus the leading zero. Types are encoded as int8
+    # (1 = moving, 0 = stationary) and mapped back to strings at the end.
+    raw_boundaries = np.empty(n_windows + 1, dtype=np.int64)
+    raw_types = np.empty(n_windows + 1, dtype=np.int8)
+    raw_confidence = np.empty(n_windows + 1, dtype=np.float32)
 
     # Always start with boundary at 0
-    raw_boundaries.append(0)
-    raw_types.append('moving' if is_moving[0] else 'stationary')
-    raw_confidence.append(1.0)
+    raw_boundaries[0] = 0
+    raw_types[0] = 1 if is_moving[0] else 0
+    raw_confidence[0] = 1.0
+    n_raw = 1
 
-    for i in range(len(windows)):
+    for i in range(1, n_windows):
         # Use window start (not center) so marker appears at beginning of new segment
         sample_idx = window_starts[i]
 
         # Check for movement state change
-        if i > 0 and movement_changes[i-1] != 0:
-            raw_boundaries.append(sample_idx)
-            raw_types.append('moving' if is_moving[i] else 'stationary')
-            raw_confidence.append(1.0)  # Movement changes are high confidence
+        if movement_changes[i-1] != 0:
+            raw_boundaries[n_raw] = sample_idx
+            raw_types[n_raw] = 1 if is_moving[i] else 0
+            raw_confidence[n_raw] = 1.0  # Movement changes are high confidence
+            n_raw += 1
 
         # Check for gait change (only within moving sections)
         elif gait_change_score[i] > 0.4:
-            raw_boundaries.append(sample_idx)
-            raw_types.append('moving')  # Gait changes only happen during movement
-            raw_confidence.append(float(gait_change_score[i]))
+            raw_boundaries[n_raw] = sample_idx
+            raw_types[n_raw] = 1  # Gait changes only happen during movement
+            raw_confidence[n_raw] = gait_change_score[i]
+            n_raw += 1
 
     # Step 6: Merge boundaries that are too close together
-    final_boundaries = [raw_boundaries[0]]
-    final_types = [raw_types[0]]
-    final_confidence = [raw_confidence[0]]
-
-    for i in range(1, len(raw_boundaries)):
-        if raw_boundaries[i] - final_boundaries[-1] >= min_samples:
-            final_boundaries.append(raw_boundaries[i])
-            final_types.append(raw_types[i])
-            final_confidence.append(raw_confidence[i])
-        else:
-            # Too close - keep the higher priority boundary
-            # Priority: movement changes > gait changes
-            is_movement_change = (raw_types[i] != final_types[-1]) or \
-                                (raw_types[i] == 'stationary' and final_types[-1] == 'moving') or \
-                                (raw_types[i] == 'moving' and final_types[-1] == 'stationary')
-            if is_movement_change or raw_confidence[i] > final_confidence[-1]:
-                final_boundaries[-1] = raw_boundaries[i]
-                final_types[-1] = raw_types[i]
-                final_confidence[-1] = raw_confidence[i]
+    merged_bounds, merged_types, merged_conf = _merge_boundaries_kernel(
+        raw_boundaries[:n_raw], raw_types[:n_raw], raw_confidence[:n_raw],
+        min_samples)
+
+    final_boundaries = merged_bounds.tolist()
+    final_types = ['moving' if t else 'stationary' for t in merged_types]
+    final_confidence = merged_conf.tolist()
 
     # Convert to times
     times = [b / sample_rate for b in final_boundaries]
@@ -207,7 +314,7 @@ def _empty_result(magnitude, sample_rate, movement_threshold,
                   variance_threshold, frequency_threshold, min_segment_seconds):
     """Return result for data too short to segment."""
     # Determine if the short segment is moving or stationary
-    mag = np.array(magnitude)
+    mag = np.asarray(magnitude, dtype=np.float32)
     var = np.var(mag) if len(mag) > 0 else 0
     seg_type = 'moving' if var > movement_threshold else 'stationary'
 
@@ -3,12 +3,16 @@ import signal
 import sys
 import socket
 import datetime
+import time
 import os
 import subprocess
 import threading
+import queue
 import json
+import struct
 import csv
 import math
+import numpy as np
 import zipfile
 import io
 import uuid
@@ -51,16 +55,21 @@ class BufferedRecorder:
         self.flush_interval = flush_interval_ms / 1000.0  # Convert to seconds
         self.buffer = deque(maxlen=buffer_size)
         self.lock = threading.Lock()
+        self.io_lock = threading.Lock()
         self.file = None
         self.running = False
         self.flush_thread = None
         self.total_samples = 0
 
     def start(self, header_lines):
-        """Open file, write headers, start flush thread"""
-        self.file = open(self.filepath, 'w', buffering=65536)  # 64KB OS buffer
+        """Open file, write headers, start flush thread.
+
+        The file is opened in binary mode: sample lines arrive as bytes
+        straight off the UDP socket and are written without a decode/encode
+        round-trip. Header and footer strings are encoded here."""
+        self.file = open(self.filepath, 'wb', buffering=65536)  # 64KB OS buffer
         for line in header_lines:
-            self.file.write(line + '\n')
+            self.file.write(line.encode('utf-8') + b'\n')
         self.running = True
         self.flush_thread = threading.Thread(target=self._flush_worker, daemon=True)
         self.flush_thread.start()
@@ -68,9 +77,16 @@ class BufferedRecorder:
     def append(self, line):
         """Thread-safe append to buffer (O(1))"""
         with self.lock:
-            self.buffer.append(line)
+            self.buffer.append(line.encode('utf-8') if isinstance(line, str) else line)
             self.total_samples += 1
 
+    def extend(self, lines):
+        """Thread-safe append of a whole batch of bytes lines — one lock
+        round-trip per UDP datagram instead of one per sample."""
+        with self.lock:
+            self.buffer.extend(lines)
+            self.total_samples += len(lines)
+
     def _flush_worker(self):
         """Background thread that flushes buffer every N milliseconds"""
         while self.running:
@@ -78,13 +94,21 @@ class BufferedRecorder:
             self._flush()
 
     def _flush(self):
-        """Write all buffered lines to disk"""
-        with self.lock:
-            if self.buffer and self.file:
-                while self.buffer:
-                    self.file.write(self.buffer.popleft())
-                self.file.flush()
-                os.fsync(self.file.fileno())
+        """Write all buffered lines to disk as a single write() call.
+
+        The buffer is swapped out under the lock but the disk I/O happens
+        under io_lock instead, so an SD-card stall never blocks the
+        listener thread yet stop() can still serialize against a flush
+        that is mid-write."""
+        with self.io_lock:
+            with self.lock:
+                if not (self.buffer and self.file):
+                    return
+                chunk = b''.join(self.buffer)
+                self.buffer.clear()
+            self.file.write(chunk)
+            self.file.flush()
+            os.fsync(self.file.fileno())
 
     def stop(self, footer_lines=None):
         """Flush remaining data, write footers, close file"""
@@ -95,14 +119,17 @@ class BufferedRecorder:
         # Final flush
         self._flush()
 
-        # Write footers
-        if footer_lines and self.file:
-            for line in footer_lines:
-                self.file.write(line + '\n')
+        # The join timeout can expire while the worker is stalled inside an
+        # SD-card write; io_lock makes the footer/close wait for it so the
+        # worker's chunk can't land after the footer or hit a closed file.
+        with self.io_lock:
+            if footer_lines and self.file:
+                for line in footer_lines:
+                    self.file.write(line.encode('utf-8') + b'\n')
 
-        if self.file:
-            self.file.close()
-            self.file = None
+            if self.file:
+                self.file.close()
+                self.file = None
 
 
 # Recording state
@@ -143,6 +170,64 @@ def send_sync_broadcast():
             print(f"Broadcast failed (non-fatal): {e}")
 
 
+# strftime is locale-aware and allocation-heavy; at hundreds of datagrams
+# per second it dominates the listener's CPU budget. The date+seconds prefix
+# only changes once a second, so format it once per second and append the
+# microsecond tail with plain integer math. Only the listener thread calls
+# this, so the two-variable cache needs no lock.
+_ts_cached_second = 0
+_ts_cached_prefix = ''
+
+
+def _sample_timestamp():
+    """Current wall-clock time as '%Y-%m-%d %H:%M:%S.%f'."""
+    global _ts_cached_second, _ts_cached_prefix
+    now = time.time()
+    second = int(now)
+    if second != _ts_cached_second:
+        _ts_cached_second = second
+        _ts_cached_prefix = datetime.datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+    return f"{_ts_cached_prefix}.{int((now - second) * 1_000_000):06d}"
+
+
+# Sample datagrams are handed off to a worker thread so the listener gets
+# back to recvfrom() immediately. A burst during an SD-card or GC stall then
+# queues in process memory instead of overflowing the kernel socket buffer
+# and dropping packets.
+_sample_queue = queue.SimpleQueue()
+
+
+def _sample_worker():
+    """Drain _sample_queue: split, filter, and hand batches to the recorder.
+
+    Each entry carries the recorder it was enqueued for. A backlog drained
+    after a quick stop→start (the normal protocol-step workflow) must not
+    leak session A's samples into session B's file, so entries whose
+    recorder is no longer the active one are dropped."""
+    while True:
+        recorder, timestamp, data, sender_ip = _sample_queue.get()
+        try:
+            if not (recording_state['is_recording']
+                    and recorder is recording_state['recorder']):
+                continue
+
+            samples = data.split(b'|')
+
+            # Track device IP once from first sample in batch
+            first = samples[0].split(b',', 2) if samples else []
+            if len(first) >= 2:
+                _device_addrs[first[0].decode('utf-8', 'replace')] = sender_ip
+
+            batch = [timestamp + b',' + stripped + b'\n'
+                     for stripped in (sample.strip() for sample in samples)
+                     if stripped and not stripped.startswith(b'BAT')]
+            if batch:
+                recorder.extend(batch)
+                recording_state['samples_received'] += len(batch)
+        except Exception as e:
+            print(f"Error in sample worker: {e}")
+
+
 def udp_listener():
     """Background thread to receive UDP data"""
     global _listener_sock
@@ -155,6 +240,19 @@ def udp_listener():
         try:
             data, addr = _listener_sock.recvfrom(4096)
             sender_ip = addr[0]
+
+            # Control and battery messages are low-rate — only they get
+            # decoded. Sample batches (the hot path) are handled as bytes
+            # end-to-end; the listener just stamps the arrival time and
+            # enqueues for _sample_worker so it can get back to recvfrom().
+            if not data.startswith((b'SYNC', b'BAT,')):
+                recorder = recording_state['recorder']
+                if recording_state['is_recording'] and recorder:
+                    _sample_queue.put(
+                        (recorder, _sample_timestamp().encode('ascii'),
+                         data, sender_ip))
+                continue
+
             decoded = data.decode('utf-8').strip()
 
             # Ignore our own broadcast loopback
@@ -195,20 +293,6 @@ def udp_listener():
                     'firmware_version': firmware_version,
                     'last_seen': datetime.datetime.now().isoformat()
                 }
-            elif recording_state['is_recording'] and recording_state['recorder']:
-                timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-                samples = decoded.split('|')
-
-                # Track device IP once from first sample in batch
-                first = samples[0].split(',', 2) if samples else []
-                if len(first) >= 2:
-                    _device_addrs[first[0]] = sender_ip
-
-                for sample in samples:
-                    if sample.strip() and not sample.startswith('BAT'):
-                        recording_state['recorder'].append(f"{timestamp},{sample}\n")
-                        recording_state['samples_received'] += 1
-
         except socket.timeout:
             continue
         except Exception as e:
@@ -217,6 +301,9 @@ def udp_listener():
 listener_thread = threading.Thread(target=udp_listener, daemon=True)
 listener_thread.start()
 
+sample_worker_thread = threading.Thread(target=_sample_worker, daemon=True)
+sample_worker_thread.start()
+
 
 # Runtime-state schema versions. Bump the constant AND add a matching
 # migration block in _migrate_* whenever you change the shape of the
@@ -532,6 +619,7 @@ def start_recording():
 
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = os.path.join(DATA_DIR, f"session_{timestamp}.csv")
+    start_time = datetime.datetime.now().isoformat()
 
     # Create buffered recorder
     recorder = BufferedRecorder(filename, flush_interval_ms=500, buffer_size=1000)
@@ -543,7 +631,7 @@ def start_recording():
     headers = [
         f"# Location: {location}",
         f"# Notes: {notes}",
-        f"# Start Time: {datetime.datetime.now().isoformat()}",
+        f"# Start Time: {start_time}",
         f"# Device Config: {json.dumps(device_config['devices'])}",
     ]
     if horse:
@@ -555,6 +643,15 @@ def start_recording():
 
     recorder.start(headers)
 
+    # Sidecar with the fields /api/sessions lists, so listing doesn't have
+    # to open and scan every CSV. The CSV header stays the source of truth;
+    # files without a sidecar fall back to the header scan.
+    meta = {'location': location, 'notes': notes, 'start_time': start_time}
+    if horse:
+        meta['horse'] = horse
+    with open(filename + '.meta.json', 'w') as f:
+        json.dump(meta, f)
+
     recording_state['is_recording'] = True
     recording_state['recorder'] = recorder
     recording_state['session_start'] = datetime.datetime.now()
@@ -611,6 +708,42 @@ def trigger_sync():
     return jsonify({'success': True})
 
 
+# Parsed metadata keyed by filepath -> (csv mtime, metadata). The web UI
+# polls /api/sessions, so unchanged files (mtime match) skip the sidecar
+# read / header scan entirely. stop_recording's footer write bumps the CSV
+# mtime, so a finished session is re-read exactly once.
+_session_meta_cache = {}
+
+
+def _session_metadata(filepath):
+    """Load a session's display metadata from its sidecar, falling back to
+    scanning the CSV header for files recorded before sidecars existed."""
+    meta_path = filepath + '.meta.json'
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    metadata = {}
+    with open(filepath, 'r') as f:
+        for line in f:
+            if line.startswith('# Location:'):
+                metadata['location'] = line.split(':', 1)[1].strip()
+            elif line.startswith('# Notes:'):
+                metadata['notes'] = line.split(':', 1)[1].strip()
+            elif line.startswith('# Start Time:'):
+                metadata['start_time'] = line.split(':', 1)[1].strip()
+            elif line.startswith('# Horse:'):
+                metadata['horse'] = line.split(':', 1)[1].strip()
+            elif line.startswith('# Total Samples:'):
+                metadata['samples'] = line.split(':', 1)[1].strip()
+            elif not line.startswith('#'):
+                break
+    return metadata
+
+
 def _scan_sessions():
     """Return parsed session list (newest first). Shared by /api/sessions and
     /api/recent_horses so we don't duplicate file-scan logic."""
@@ -620,23 +753,14 @@ def _scan_sessions():
             continue
         filepath = os.path.join(DATA_DIR, filename)
 
-        metadata = {}
-        with open(filepath, 'r') as f:
-            for line in f:
-                if line.startswith('# Location:'):
-                    metadata['location'] = line.split(':', 1)[1].strip()
-                elif line.startswith('# Notes:'):
-                    metadata['notes'] = line.split(':', 1)[1].strip()
-                elif line.startswith('# Start Time:'):
-                    metadata['start_time'] = line.split(':', 1)[1].strip()
-                elif line.startswith('# Horse:'):
-                    metadata['horse'] = line.split(':', 1)[1].strip()
-                elif line.startswith('# Total Samples:'):
-                    metadata['samples'] = line.split(':', 1)[1].strip()
-                elif not line.startswith('#'):
-                    break
-
         stat = os.stat(filepath)
+        cached = _session_meta_cache.get(filepath)
+        if cached is not None and cached[0] == stat.st_mtime:
+            metadata = cached[1]
+        else:
+            metadata = _session_metadata(filepath)
+            _session_meta_cache[filepath] = (stat.st_mtime, metadata)
+
         sessions.append({
             'filename': filename,
             'size': stat.st_size,
@@ -665,54 +789,49 @@ def recent_horses():
                 break
     return jsonify({'horses': seen})
 
-@app.route('/api/session_data/<filename>')
-def get_session_data(filename):
-    """Get accelerometer data for plotting (multi-device support)"""
-    filepath = os.path.join(DATA_DIR, filename)
-
-    if not os.path.exists(filepath):
-        return jsonify({'error': 'File not found'}), 404
-
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
+def _group_session_samples(data_lines, device_config):
+    """Vectorized CSV parse for plotting: one numpy text load plus whole-
+    column casts instead of a Python split()/float() loop per line — an
+    order of magnitude faster for a 10k-sample request on the Pi.
 
-    # Extract device config and horse name from header. These travel with the
-    # response so the session viewer can show who the recording was for.
-    device_config = {}
-    horse = None
-    for line in lines:
-        if line.startswith('# Device Config:'):
-            try:
-                config_json = line.split(':', 1)[1].strip()
-                device_config = json.loads(config_json)
-            except (json.JSONDecodeError, IndexError):
-                pass
-        elif line.startswith('# Horse:'):
-            horse = line.split(':', 1)[1].strip()
-        elif not line.startswith('#'):
-            break
+    Raises ValueError if any row is malformed (ragged or non-numeric);
+    callers fall back to _group_session_samples_slow."""
+    cells = np.loadtxt(data_lines, delimiter=',', dtype=str, ndmin=2)
+    if cells.shape[1] < 6:  # timestamp,device_id,sequence,x,y,z[,gx,gy,gz]
+        raise ValueError('too few columns')
 
-    # Find where data starts
-    data_start_idx = 0
-    for i, line in enumerate(lines):
-        if not line.startswith('#'):
-            data_start_idx = i + 1
-            break
+    accel = cells[:, 3:6].astype(np.float64)
+    magnitude = np.sqrt((accel * accel).sum(axis=1))
+    gyro = cells[:, 6:9].astype(np.float64) if cells.shape[1] >= 9 else None
 
-    # Group data by device_id
     devices = {}
-    sample_count = 0
+    device_ids = cells[:, 1]
+    # np.unique sorts; reorder by first appearance so the viewer's "first
+    # device" stays whichever device showed up first in the file
+    unique_ids, first_pos = np.unique(device_ids, return_index=True)
+    for device_id in unique_ids[np.argsort(first_pos)]:
+        mask = device_ids == device_id
+        devices[str(device_id)] = {
+            'timestamps': cells[mask, 0].tolist(),
+            'accel_x': accel[mask, 0].tolist(),
+            'accel_y': accel[mask, 1].tolist(),
+            'accel_z': accel[mask, 2].tolist(),
+            'magnitude': magnitude[mask].tolist(),
+            'gyro_x': gyro[mask, 0].tolist() if gyro is not None else [],
+            'gyro_y': gyro[mask, 1].tolist() if gyro is not None else [],
+            'gyro_z': gyro[mask, 2].tolist() if gyro is not None else [],
+            'config': device_config.get(str(device_id), {})
+        }
+    return devices
 
-    for line in lines[data_start_idx:]:
-        if sample_count >= 10000:  # Limit to 10k points total
-            break
-
-        line = line.strip()
-        if not line:
-            continue
 
+def _group_session_samples_slow(data_lines, device_config):
+    """Line-by-line parser that skips rows it can't parse. Kept as the
+    fallback for files with corrupt lines (unclean shutdown mid-write)."""
+    devices = {}
+    for line in data_lines:
         parts = line.split(',')
-        if len(parts) >= 6:  # timestamp,device_id,sequence,x,y,z[,gx,gy,gz]
+        if len(parts) >= 6:
             try:
                 timestamp = parts[0]
                 device_id = parts[1]
@@ -745,11 +864,72 @@ def get_session_data(filename):
                     devices[device_id]['gyro_y'].append(float(parts[7]))
                     devices[device_id]['gyro_z'].append(float(parts[8]))
 
-                sample_count += 1
-
             except (ValueError, IndexError) as e:
                 print(f"Error parsing line: {line} - {e}")
                 continue
+    return devices
+
+
+def _load_session_for_plotting(filepath):
+    """Read a session CSV into per-device plotting arrays, decimated to
+    <=10k points. Shared by the JSON and binary session_data endpoints."""
+    with open(filepath, 'r') as f:
+        lines = f.readlines()
+
+    # Extract device config and horse name from header. These travel with the
+    # response so the session viewer can show who the recording was for.
+    device_config = {}
+    horse = None
+    for line in lines:
+        if line.startswith('# Device Config:'):
+            try:
+                config_json = line.split(':', 1)[1].strip()
+                device_config = json.loads(config_json)
+            except (json.JSONDecodeError, IndexError):
+                pass
+        elif line.startswith('# Horse:'):
+            horse = line.split(':', 1)[1].strip()
+        elif not line.startswith('#'):
+            break
+
+    # Find where data starts
+    data_start_idx = 0
+    for i, line in enumerate(lines):
+        if not line.startswith('#'):
+            data_start_idx = i + 1
+            break
+
+    # Group data by device_id, capped at 10k points total. Long sessions are
+    # decimated by a stride over the whole file rather than truncated at the
+    # first 10k samples — a 10-minute recording used to show only its first
+    # ~51 seconds.
+    data_lines = [line for line in map(str.strip, lines[data_start_idx:])
+                  if line and not line.startswith('#')]
+    stride = math.ceil(len(data_lines) / 10000) if data_lines else 1
+    if stride > 1:
+        data_lines = data_lines[::stride]
+
+    devices = {}
+    if data_lines:
+        try:
+            devices = _group_session_samples(data_lines, device_config)
+        except ValueError:
+            # Malformed row somewhere (e.g. a line truncated by power loss)
+            # — fall back to the tolerant line-by-line parser.
+            devices = _group_session_samples_slow(data_lines, device_config)
+    return devices, device_config, horse
+
+
+@app.route('/api/session_data/<filename>')
+def get_session_data(filename):
+    """Get accelerometer data for plotting (multi-device support)"""
+    filepath = os.path.join(DATA_DIR, filename)
+
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'File not found'}), 404
+
+    devices, device_config, horse = _load_session_for_plotting(filepath)
+    sample_count = sum(len(d['timestamps']) for d in devices.values())
 
     print(f"Loaded {sample_count} samples from {filename} across {len(devices)} devices")
 
@@ -761,6 +941,62 @@ def get_session_data(filename):
     })
 
 
+SESSION_BIN_FIELDS = ('accel_x', 'accel_y', 'accel_z', 'magnitude',
+                      'gyro_x', 'gyro_y', 'gyro_z')
+
+
+@app.route('/api/session_data_bin/<filename>')
+def get_session_data_bin(filename):
+    """Binary twin of /api/session_data: float arrays travel as raw
+    little-endian float32 instead of JSON number text — about 4x smaller
+    on the wire for a 10k-sample session and decoded in the browser with a
+    single Float32Array view instead of per-number parsing.
+
+    Layout: 4-byte LE header length, UTF-8 JSON header (space-padded to a
+    4-byte boundary so typed-array views stay aligned), then for each
+    device in header order each field in SESSION_BIN_FIELDS order as
+    float32[count] (gyro fields are zero-length when has_gyro is false).
+    view_session.html is the consumer; the JSON endpoint stays for
+    anything that wants the data human-readable."""
+    filepath = os.path.join(DATA_DIR, filename)
+
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'File not found'}), 404
+
+    devices, device_config, horse = _load_session_for_plotting(filepath)
+    sample_count = sum(len(d['timestamps']) for d in devices.values())
+
+    header = {
+        # Explicit block order: JS objects iterate integer-like keys (an
+        # all-decimal MAC suffix such as "123456") numerically first, so
+        # the decoder must not rely on JSON key order to walk the blocks.
+        'device_order': list(devices.keys()),
+        'devices': {
+            device_id: {
+                'count': len(dev['timestamps']),
+                'has_gyro': len(dev['gyro_x']) > 0,
+                'config': dev['config'],
+            }
+            for device_id, dev in devices.items()
+        },
+        'fields': list(SESSION_BIN_FIELDS),
+        'device_config': device_config,
+        'sample_count': sample_count,
+        'horse': horse,
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % 4)
+
+    buf = io.BytesIO()
+    buf.write(struct.pack('<I', len(header_bytes)))
+    buf.write(header_bytes)
+    for dev in devices.values():
+        for field in SESSION_BIN_FIELDS:
+            buf.write(np.asarray(dev[field], dtype='<f4').tobytes())
+    buf.seek(0)
+    return send_file(buf, mimetype='application/octet-stream')
+
+
 @app.route('/api/download/<filename>')
 def download_session(filename):
     """Download raw CSV file"""
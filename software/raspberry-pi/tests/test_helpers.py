@@ -97,6 +97,21 @@ def test_find_protocol_returns_none_for_missing():
     assert horse_recorder._find_protocol({}, 'nope') is None
 
 
+def test_sample_timestamp_matches_csv_format():
+    """The CSV timestamp column contract: '%Y-%m-%d %H:%M:%S.%f', parseable
+    by datetime and close to wall-clock now."""
+    import datetime
+    ts = horse_recorder._sample_timestamp()
+    parsed = datetime.datetime.strptime(ts, '%Y-%m-%d %H:%M:%S.%f')
+    assert abs((datetime.datetime.now() - parsed).total_seconds()) < 2
+
+
+def test_sample_timestamp_is_monotonic_within_a_second():
+    first = horse_recorder._sample_timestamp()
+    second = horse_recorder._sample_timestamp()
+    assert second >= first  # lexicographic == chronological for this format
+
+
 def test_load_device_config_returns_default_when_missing(isolated_paths):
     """Same robustness as protocols — first boot shouldn't crash."""
     config = horse_recorder.load_device_config()
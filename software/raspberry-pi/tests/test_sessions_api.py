@@ -80,3 +80,179 @@ def test_sessions_sorted_newest_first(client, isolated_paths):
     assert len(sessions) == 2
     assert sessions[0]['metadata']['location'] == 'second'
     assert sessions[1]['metadata']['location'] == 'first'
+
+
+def test_start_writes_metadata_sidecar(client, isolated_paths):
+    """Recording writes a .meta.json next to the CSV so /api/sessions can
+    list without scanning the CSV header."""
+    import json
+
+    client.post('/api/start', json={'location': 'arena', 'horse': 'Spicy', 'notes': 'n'})
+    client.post('/api/stop')
+
+    sidecars = list(isolated_paths['data_dir'].glob('*.meta.json'))
+    assert len(sidecars) == 1
+    meta = json.loads(sidecars[0].read_text())
+    assert meta['location'] == 'arena'
+    assert meta['horse'] == 'Spicy'
+    assert 'start_time' in meta
+
+
+def test_sessions_falls_back_to_header_scan_without_sidecar(client, isolated_paths):
+    """Files recorded before sidecars existed must still list correctly."""
+    (isolated_paths['data_dir'] / 'session_20250101_090000.csv').write_text(
+        '# Location: old barn\n'
+        '# Notes: legacy\n'
+        '# Start Time: 2025-01-01T09:00:00\n'
+        'timestamp,device_id,millis_time,accel_x,accel_y,accel_z\n'
+    )
+
+    sessions = client.get('/api/sessions').get_json()
+    assert sessions[0]['metadata']['location'] == 'old barn'
+    assert sessions[0]['metadata']['notes'] == 'legacy'
+
+
+def test_sessions_cache_invalidates_on_mtime_change(client, isolated_paths):
+    """The scan memoizes metadata per (filepath, mtime); a rewritten file
+    must be re-read, not served stale."""
+    import os
+
+    path = isolated_paths['data_dir'] / 'session_20250101_090000.csv'
+    path.write_text('# Location: before\n# Notes: n\ntimestamp,device_id\n')
+
+    sessions = client.get('/api/sessions').get_json()
+    assert sessions[0]['metadata']['location'] == 'before'
+
+    path.write_text('# Location: after\n# Notes: n\ntimestamp,device_id\n')
+    # Force a different mtime — same-second rewrites are real on the Pi.
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 5))
+
+    sessions = client.get('/api/sessions').get_json()
+    assert sessions[0]['metadata']['location'] == 'after'
+
+
+SESSION_HEADER = [
+    '# Location: arena',
+    '# Notes: n',
+    '# Start Time: 2026-08-30T10:00:00',
+    '# Device Config: {"AABB01": {"position": "poll"}}',
+    'timestamp,device_id,millis_time,accel_x,accel_y,accel_z,gyro_x,gyro_y,gyro_z',
+]
+
+
+def _write_session(data_dir, rows, name='session_20260830_100000.csv'):
+    path = data_dir / name
+    path.write_text('\n'.join(SESSION_HEADER + rows) + '\n')
+    return name
+
+
+def test_session_data_shape_and_values(client, isolated_paths):
+    """Pins the JSON contract view_session.html reads: per-device arrays for
+    timestamps, accel, magnitude, gyro, plus config and sample_count."""
+    name = _write_session(isolated_paths['data_dir'], [
+        '2026-08-30 10:00:00.000100,AABB01,100,0.0,3.0,4.0,1.0,2.0,3.0',
+        '2026-08-30 10:00:00.000200,CCDD02,101,1.0,0.0,0.0,4.0,5.0,6.0',
+        '2026-08-30 10:00:00.000300,AABB01,102,0.0,0.0,2.0,7.0,8.0,9.0',
+    ])
+
+    data = client.get(f'/api/session_data/{name}').get_json()
+    assert data['sample_count'] == 3
+    # First-seen file order, not alphabetical, decides the viewer's default.
+    assert list(data['devices'].keys()) == ['AABB01', 'CCDD02']
+
+    dev = data['devices']['AABB01']
+    assert dev['timestamps'] == ['2026-08-30 10:00:00.000100',
+                                 '2026-08-30 10:00:00.000300']
+    assert dev['accel_y'] == [3.0, 0.0]
+    assert dev['magnitude'] == [5.0, 2.0]
+    assert dev['gyro_z'] == [3.0, 9.0]
+    assert dev['config'] == {'position': 'poll'}
+
+
+def test_session_data_decimates_long_sessions(client, isolated_paths):
+    """Long recordings are strided down to <=10k points spanning the whole
+    file instead of truncated to the first 10k samples."""
+    rows = [f'2026-08-30 10:00:{i % 60:02d}.{i:06d},AABB01,{i},0.1,0.2,0.3,1,2,3'
+            for i in range(25000)]
+    name = _write_session(isolated_paths['data_dir'], rows)
+
+    data = client.get(f'/api/session_data/{name}').get_json()
+    assert data['sample_count'] <= 10000
+
+    timestamps = data['devices']['AABB01']['timestamps']
+    # stride = ceil(25000 / 10000) = 3: first row kept, tail represented
+    assert timestamps[0] == rows[0].split(',')[0]
+    assert timestamps[-1] == rows[::3][-1].split(',')[0]
+
+
+def test_session_data_bin_layout(client, isolated_paths):
+    """Pins the binary wire format view_session.html decodes: 4-byte LE
+    header length, JSON header padded to a 4-byte boundary, then per-device
+    float32 arrays in device_order x field order.
+
+    The second device is deliberately an all-decimal MAC suffix: JS objects
+    iterate integer-like keys first, so the decoder must follow the explicit
+    device_order list, never the devices key order."""
+    import json
+    import struct
+    import numpy as np
+
+    name = _write_session(isolated_paths['data_dir'], [
+        '2026-08-30 10:00:00.000100,AABB01,100,0.0,3.0,4.0,1.0,2.0,3.0',
+        '2026-08-30 10:00:00.000200,123456,101,1.0,0.0,0.0,4.0,5.0,6.0',
+        '2026-08-30 10:00:00.000300,AABB01,102,0.0,0.0,2.0,7.0,8.0,9.0',
+    ])
+
+    resp = client.get(f'/api/session_data_bin/{name}')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'application/octet-stream'
+
+    raw = resp.data
+    header_len = struct.unpack_from('<I', raw)[0]
+    header = json.loads(raw[4:4 + header_len])
+    assert header['sample_count'] == 3
+    # First-seen file order, carried explicitly because the decimal ID would
+    # iterate first out of a JS object.
+    assert header['device_order'] == ['AABB01', '123456']
+    assert header['devices']['AABB01']['config'] == {'position': 'poll'}
+    assert header['fields'] == ['accel_x', 'accel_y', 'accel_z', 'magnitude',
+                                'gyro_x', 'gyro_y', 'gyro_z']
+
+    offset = 4 + header_len
+    assert offset % 4 == 0  # Float32Array views require 4-byte alignment
+
+    decoded = {}
+    for device_id in header['device_order']:
+        meta = header['devices'][device_id]
+        decoded[device_id] = {}
+        for field in header['fields']:
+            n = 0 if field.startswith('gyro') and not meta['has_gyro'] else meta['count']
+            decoded[device_id][field] = np.frombuffer(
+                raw, dtype='<f4', count=n, offset=offset).tolist()
+            offset += n * 4
+    assert offset == len(raw)
+
+    assert decoded['AABB01']['accel_y'] == [3.0, 0.0]
+    assert decoded['AABB01']['magnitude'] == [5.0, 2.0]
+    assert decoded['AABB01']['gyro_z'] == [3.0, 9.0]
+    assert decoded['123456']['gyro_z'] == [6.0]
+
+
+def test_session_data_bin_missing_file_404(client, isolated_paths):
+    resp = client.get('/api/session_data_bin/session_nope.csv')
+    assert resp.status_code == 404
+
+
+def test_session_data_tolerates_truncated_line(client, isolated_paths):
+    """A power loss mid-write leaves a partial last line; the parser must
+    keep the good rows instead of erroring out."""
+    name = _write_session(isolated_paths['data_dir'], [
+        '2026-08-30 10:00:00.000100,AABB01,100,0.0,3.0,4.0,1.0,2.0,3.0',
+        '2026-08-30 10:00:00.000200,AABB01,101,1.0,0.0,0.0,4.0,5.0,6.0',
+        '2026-08-30 10:00:00.000300,AABB01,102,0.5,0.',
+    ])
+
+    data = client.get(f'/api/session_data/{name}').get_json()
+    assert data['sample_count'] == 2
+    assert data['devices']['AABB01']['accel_x'] == [0.0, 1.0]